@@ -1,6 +1,202 @@
+import functools
+import hashlib
+import json
 import os
+import random
+import re
 import sys
-import requests
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+# orjson is optional; its C encoder/decoder is noticeably faster than the stdlib.
+# _dumps always returns UTF-8 bytes so request bodies can be posted as-is.
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+
+
+# -----------------------------
+# HTTP session
+# -----------------------------
+
+# The HTTP stack (requests/urllib3, optionally httpx) is imported on first use by
+# get_session(), so a run with missing inputs fails before paying its import cost.
+requests = None
+urllib3 = None
+_SESSION = None
+_HTTP2_CLIENT = None
+_POLL_POOL = None
+_HTTP_ERRORS = ()
+
+def get_session():
+    """
+    Returns the shared requests session, creating it on first use.
+    Every call goes to the same RSC host, so one pooled session keeps the TCP/TLS
+    connection alive across auth, lookups, the mutation and status polls.
+    When httpx is installed with HTTP/2 support, every GraphQL call (lookups,
+    mutation and status polls) goes through it instead, so the concurrent lookups
+    are multiplexed over one connection and headers are HPACK-compressed.
+    Otherwise the poll loop talks to urllib3 directly, skipping the per-call
+    request preparation, hooks and cookie handling of requests.
+    """
+    global requests, urllib3, _SESSION, _HTTP2_CLIENT, _POLL_POOL, _HTTP_ERRORS
+    if _SESSION is not None:
+        return _SESSION
+
+    import urllib.request
+
+    import requests
+    import urllib3
+    from requests.adapters import HTTPAdapter
+
+    # Retry connection failures only: nothing has reached RSC yet, so this is safe
+    # even for the backup mutation. urllib3's default allowed_methods leaves out
+    # POST, so a request RSC may already have acted on (error status, read
+    # timeout) is never re-sent automatically.
+    retry = urllib3.util.Retry(total=3, backoff_factor=0.5, raise_on_status=False)
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+    session.headers.update({"Accept": "application/json", "Content-Type": "application/json"})
+    _HTTP_ERRORS = (requests.RequestException, urllib3.exceptions.HTTPError)
+
+    # Honour the same CA bundle overrides as requests (corporate CAs on self-hosted runners)
+    ca_certs = (
+        os.environ.get("REQUESTS_CA_BUNDLE")
+        or os.environ.get("CURL_CA_BUNDLE")
+        or requests.utils.DEFAULT_CA_BUNDLE_PATH
+    )
+
+    try:
+        import h2  # noqa: F401 (required by httpx for http2=True)
+        import httpx
+        _HTTP2_CLIENT = httpx.Client(
+            http2=True,
+            verify=ca_certs,
+            timeout=30.0,
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+            limits=httpx.Limits(max_keepalive_connections=4),
+        )
+        _HTTP_ERRORS += (httpx.HTTPError,)
+    except ImportError:
+        # Raw urllib3 does not read proxy settings from the environment, so leave
+        # proxied runners on the requests session.
+        if not urllib.request.getproxies():
+            _POLL_POOL = urllib3.PoolManager(
+                num_pools=1,
+                maxsize=2,
+                headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"},
+                ca_certs=ca_certs,
+                retries=False,
+            )
+
+    _SESSION = session
+    return _SESSION
+
+
+# -----------------------------
+# GraphQL documents
+# -----------------------------
+
+# The documents are static, so build them once at import rather than per call.
+# Whitespace is collapsed so the indentation is not sent (and lexed) on every request.
+def compact_graphql(document: str) -> str:
+    return " ".join(document.split())
+
+_SLA_QUERY = compact_graphql("""
+query GetSLADomainID($filter: [GlobalSlaFilterInput!]) {
+  slaDomains(filter: $filter) {
+    nodes {
+      id
+      name
+    }
+  }
+}
+""")
+
+_REPO_QUERY = compact_graphql("""
+query GithubReposListQuery($filter: [Filter!], $ancestorId: String!, $queryType: QueryType!) {
+  gitHubRepositories(filter: $filter, ancestorId: $ancestorId, queryType: $queryType) {
+    nodes {
+      id
+      name
+      orgName
+    }
+  }
+}
+""")
+
+_LOOKUP_QUERY = compact_graphql("""
+query Lookup($repoFilter: [Filter!], $slaFilter: [GlobalSlaFilterInput!]) {
+  repo: gitHubRepositories(filter: $repoFilter, ancestorId: "GITHUB_ROOT", queryType: DESCENDANTS) {
+    nodes {
+      id
+      name
+    }
+  }
+  sla: slaDomains(filter: $slaFilter) {
+    nodes {
+      id
+      name
+    }
+  }
+}
+""")
+
+_SNAPSHOT_MUTATION = compact_graphql("""
+mutation GithubTakeOnDemandSnapshotMutation($input: BackupDevOpsRepositoryInput!) {
+  backupDevOpsRepository(input: $input) {
+    taskchainId
+    errorMessage
+    __typename
+  }
+}
+""")
+
+_POLL_QUERY = compact_graphql("""
+query EventSeriesStatusQuery($activitySeriesId: UUID!, $clusterUuid: UUID) {
+  activitySeries(
+    input: {activitySeriesId: $activitySeriesId, clusterUuid: $clusterUuid}
+  ) {
+    lastActivityStatus
+  }
+}
+""")
+
+_SUBSCRIPTION = compact_graphql("""
+subscription ActivitySeriesEvents($activitySeriesId: UUID!, $clusterUuid: UUID) {
+  activitySeriesEvents(
+    input: {activitySeriesId: $activitySeriesId, clusterUuid: $clusterUuid}
+  ) {
+    lastActivityStatus
+  }
+}
+""")
+
+_DETAILS_QUERY = compact_graphql("""
+query EventSeriesDetailsQuery($activitySeriesId: UUID!, $clusterUuid: UUID) {
+  activitySeries(
+    input: {activitySeriesId: $activitySeriesId, clusterUuid: $clusterUuid}
+  ) {
+    lastActivityStatus
+    activityConnection {
+      nodes {
+        activityInfo
+        errorInfo
+        message
+        status
+      }
+    }
+  }
+}
+""")
 
 
 # -----------------------------
@@ -11,37 +207,56 @@ import requests
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-# sleep helper
-def sleep_seconds(seconds: int) -> None:
-    os.system(f"sleep {int(seconds)}")
-
 # normalize base URI by stripping trailing slashes if present
+# (str.strip/rstrip hand back the same object when there is nothing to remove)
 def normalize_base_uri(uri: str) -> str:
-    return (uri or "").strip().rstrip("/")
+    return uri.strip().rstrip("/") if uri else ""
 
 # converts GitHub Action string inputs to boolean
+_FALSE = frozenset({"false", "0", "no", "off"})
+
 def str_to_bool(value: str, default: bool = True) -> bool:
     """
     GitHub Action inputs are strings.
-    Treat 'false' (case-insensitive) as False, everything else as True.
+    Treat 'false', '0', 'no' and 'off' (case-insensitive) as False, everything else as True.
+    Unset or blank values keep the default.
     """
-    if value is None:
-        return default
-    return value.strip().lower() != "false"
+    return default if not value or value.isspace() else value.strip().lower() not in _FALSE
+
+# Memoizes a lookup for the life of the process, but only once it returns a value.
+# A None (not found / request failed) is never cached, so it is retried next time.
+def cache_found(func):
+    cache = {}
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        if args in cache:
+            return cache[args]
+        result = func(*args)
+        if result is not None:
+            cache[args] = result
+        return result
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
 
 # Sometimes a transient error occurs immediately after triggering a backup.
 # This condition is expected due to eventual consistency and should be retried
 # rather than treated as a terminal failure.
+_TRANSIENT_MSG = "unexpected internal error"
+
 def is_transient_activityseries_500(errors) -> bool:
+    # The "not ready yet" response carries a single error; a long list is something else
+    if not errors or len(errors) > 4:
+        return False
     try:
-        for e in errors or []:
-            if e.get("path") == ["activitySeries"]:
-                ext = e.get("extensions") or {}
-                code = ext.get("code")
-                msg = (e.get("message") or "").lower()
-                if code == 500 and "unexpected internal error" in msg:
-                    return True
-    except Exception:
+        for e in errors:
+            if e.get("path") != ["activitySeries"]:
+                continue
+            ext = e.get("extensions")
+            if ext and ext.get("code") == 500 and _TRANSIENT_MSG in (e.get("message") or "").lower():
+                return True
+    except AttributeError:
         pass
     return False
 
@@ -56,55 +271,187 @@ def extract_trace_id(errors):
     except Exception:
         return None
 
-# Send POST requests to GraphQL endpoint
-def post_graphql(rsc_uri: str, token: str, query: str, variables: dict, timeout: int = 30):
+# HTTP status carried by a transport error, if any (requests/httpx responses,
+# or the status attached by the urllib3 poll path)
+def http_status(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) or getattr(exc, "status", None)
+
+# Per-run handle on the RSC GraphQL endpoint, built once in main and passed down
+class RscClient:
     """
-    General GraphQL POST helper.
-    Returns parsed JSON dict on success, or None on any failure (prints to stderr).
+    Holds the pooled session (the HTTP/2 client when available, see get_session),
+    the GraphQL URL and the auth provider for one RSC instance, so the URL and
+    headers are not rebuilt on every request.
+    auth_provider returns the current Authorization value; the headers dict is
+    only rebuilt when it changes (i.e. after a token refresh). on_unauthorized,
+    if given, is called when RSC rejects the token with a 401.
     """
-    url = f"{rsc_uri}/api/graphql"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
-    payload = {"query": query, "variables": variables}
+    __slots__ = ("session", "graphql_url", "auth_provider", "on_unauthorized", "_headers")
+
+    def __init__(self, rsc_uri: str, auth_provider, on_unauthorized=None):
+        self.session = get_session()
+        if _HTTP2_CLIENT is not None:
+            self.session = _HTTP2_CLIENT
+        self.graphql_url = f"{rsc_uri}/api/graphql"
+        self.auth_provider = auth_provider
+        self.on_unauthorized = on_unauthorized
+        self._headers = {}
+
+    def headers(self) -> dict:
+        auth = self.auth_provider()
+        if not auth:
+            raise requests.RequestException("could not obtain an access token")
+        if self._headers.get("Authorization") is not auth:
+            self._headers = {
+                "Authorization": auth,
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            }
+        return self._headers
+
+    # Drops the rejected token so the next request (and the next run) gets a new one
+    def check_unauthorized(self, exc):
+        if http_status(exc) == 401 and self.on_unauthorized is not None:
+            self.on_unauthorized()
+
+    # Send POST requests to GraphQL endpoint
+    def post(self, query: str, variables: dict, timeout: int = 30, report_errors: bool = True):
+        """
+        General GraphQL POST helper.
+        Returns parsed JSON dict on success, or None on any failure (prints to stderr).
+        With report_errors=False, GraphQL errors (e.g. a best-effort read) are not printed.
+        """
+        body = _dumps({"query": query, "variables": variables})
 
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        eprint(f"GraphQL request failed: {e}")
-        return None
+        try:
+            if self.session is _HTTP2_CLIENT:
+                resp = self.session.post(self.graphql_url, headers=self.headers(), content=body, timeout=timeout)
+            else:
+                resp = self.session.post(self.graphql_url, headers=self.headers(), data=body, timeout=timeout)
+            resp.raise_for_status()
+        except _HTTP_ERRORS as e:
+            self.check_unauthorized(e)
+            eprint(f"GraphQL request failed: {e}")
+            return None
 
-    try:
-        data = resp.json()
-    except ValueError:
-        eprint("GraphQL response was not valid JSON")
-        return None
+        try:
+            data = _loads(resp.content)
+        except ValueError:
+            eprint("GraphQL response was not valid JSON")
+            return None
 
-    if data.get("errors"):
-        eprint(f"GraphQL errors: {data['errors']}")
-        return None
+        if data.get("errors"):
+            if report_errors:
+                eprint(f"GraphQL errors: {data['errors']}")
+            return None
 
-    return data
+        return data
 
 
 # -----------------------------
 # Auth
 # -----------------------------
 
-# Obtain OAuth access token
+# Cache key for a tenant + client + secret, so a changed (or wrong) secret never
+# reuses a token issued for the old one. The parts are NUL-delimited before hashing.
+def token_cache_key(rsc_uri, client_id, client_secret):
+    return hashlib.sha256("\0".join((rsc_uri, client_id, client_secret)).encode("utf-8")).hexdigest()
+
+# Location of the on-disk token cache for a given cache key (see token_cache_key)
+def token_cache_path(key):
+    return os.path.join(tempfile.gettempdir(), f"rubrik_token_{key}.json")
+
+# Returns (token, expires_at) from the cache if present and unexpired, otherwise None
+def read_cached_token(path):
+    try:
+        st = os.stat(path)
+        # Never trust a cache file we don't own (shared temp dirs on self-hosted runners)
+        if hasattr(os, "getuid") and st.st_uid != os.getuid():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("exp", 0) <= time.time() or not cached.get("access_token"):
+            return None
+        return cached["access_token"], cached["exp"]
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# Persists the access token (owner-only permissions) until it should be refreshed
+def write_cached_token(path, token, expires_at):
+    """
+    Writes a fresh 0600 file (mkstemp) and renames it into place, so the token is
+    never written into an existing file someone else created at the predictable path.
+    """
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix="rubrik_token_", suffix=".tmp", dir=os.path.dirname(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"access_token": token, "exp": expires_at}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        eprint(f"Could not cache access token: {e}")
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+# Obtain OAuth access token (reusing a cached one while it is still valid)
 def get_access_token(rsc_uri, client_id, client_secret):
+    """
+    Returns (token, expires_at). expires_at is when the token should be refreshed
+    (60s before it actually expires), or None if RSC did not report a lifetime.
+    """
+    cache_path = token_cache_path(token_cache_key(rsc_uri, client_id, client_secret))
+    cached = read_cached_token(cache_path)
+    if cached:
+        return cached
+
     url = f"{rsc_uri}/api/client_token"
     payload = {
         "client_id": client_id,
         "client_secret": client_secret,
         "grant_type": "client_credentials"
     }
-    response = requests.post(url, json=payload, timeout=30)
+    response = get_session().post(url, data=_dumps(payload), timeout=30)
     response.raise_for_status()
-    return response.json().get("access_token")
+    data = _loads(response.content)
+
+    token = data.get("access_token")
+    expires_in = data.get("expires_in")
+    expires_at = None
+    if token and isinstance(expires_in, (int, float)):
+        expires_at = time.time() + expires_in - 60
+        write_cached_token(cache_path, token, expires_at)
+    return token, expires_at
+
+# In-process cache of Authorization values, keyed by token_cache_key
+_TOKEN_CACHE = {}
+
+# Forgets a token RSC has rejected, in memory and on disk
+def forget_access_token(rsc_uri, client_id, client_secret):
+    key = token_cache_key(rsc_uri, client_id, client_secret)
+    _TOKEN_CACHE.pop(key, None)
+    try:
+        os.remove(token_cache_path(key))
+    except OSError:
+        pass
+
+# Returns a current "Bearer ..." Authorization value, re-acquiring the token near expiry
+def get_auth_header(rsc_uri, client_id, client_secret):
+    key = token_cache_key(rsc_uri, client_id, client_secret)
+    cached = _TOKEN_CACHE.get(key)
+    if cached and (cached[1] is None or time.time() < cached[1]):
+        return cached[0]
+
+    token, expires_at = get_access_token(rsc_uri, client_id, client_secret)
+    if not token:
+        return None
+
+    value = f"Bearer {token}"
+    _TOKEN_CACHE[key] = (value, expires_at)
+    return value
 
 
 # -----------------------------
@@ -112,18 +459,8 @@ def get_access_token(rsc_uri, client_id, client_secret):
 # -----------------------------
 
 # Get SLA Domain ID by name
-def get_rubrik_sla_domain_id(rsc_uri, token, sla_name):
-    query = """
-    query GetSLADomainID($filter: [GlobalSlaFilterInput!]) {
-      slaDomains(filter: $filter) {
-        nodes {
-          id
-          name
-        }
-      }
-    }
-    """.strip()
-
+@cache_found
+def get_rubrik_sla_domain_id(client, sla_name):
     # Keeping your variable structure as-is (no query changes)
     variables = {
         "filter": {
@@ -132,7 +469,7 @@ def get_rubrik_sla_domain_id(rsc_uri, token, sla_name):
         }
     }
 
-    result = post_graphql(rsc_uri, token, query, variables)
+    result = client.post(_SLA_QUERY, variables)
     if not result:
         return None
 
@@ -148,7 +485,8 @@ def get_rubrik_sla_domain_id(rsc_uri, token, sla_name):
     return nodes[0].get("id")
 
 # Get GitHub Repository ID by full name (e.g. 'owner/repo')
-def get_rubrik_repo_id(rsc_uri, token, github_repo):
+@cache_found
+def get_rubrik_repo_id(client, github_repo):
     """Searches RSC for the GitHub repository ID using the full name."""
     if not github_repo:
         eprint("get_rubrik_repo_id: github_repo must be provided")
@@ -157,18 +495,6 @@ def get_rubrik_repo_id(rsc_uri, token, github_repo):
     # Extract only the repository name if input includes owner (e.g., 'owner/repo' -> 'repo')
     repo_name = github_repo.split("/")[-1]
 
-    query = """
-    query GithubReposListQuery($filter: [Filter!], $ancestorId: String!, $queryType: QueryType!) {
-      gitHubRepositories(filter: $filter, ancestorId: $ancestorId, queryType: $queryType) {
-        nodes {
-          id
-          name
-          orgName
-        }
-      }
-    }
-    """.strip()
-
     variables = {
         "filter": [
             {
@@ -180,7 +506,7 @@ def get_rubrik_repo_id(rsc_uri, token, github_repo):
         "queryType": "DESCENDANTS"
     }
 
-    result = post_graphql(rsc_uri, token, query, variables)
+    result = client.post(_REPO_QUERY, variables)
     if not result:
         return None
 
@@ -195,26 +521,68 @@ def get_rubrik_repo_id(rsc_uri, token, github_repo):
 
     return nodes[0].get("id")
 
+# Get the GitHub Repository ID and SLA Domain ID in a single round-trip
+def get_repo_and_sla_ids(client, github_repo, sla_name):
+    """
+    Resolves both IDs with one GraphQL request instead of two sequential lookups.
+    Returns (repo_id, sla_domain_id) where either may be None if not found,
+    or None if the request itself fails.
+    """
+    if not github_repo:
+        eprint("get_repo_and_sla_ids: github_repo must be provided")
+        return None
+
+    repo_name = github_repo.split("/")[-1]
+
+    variables = {
+        "repoFilter": [
+            {
+                "field": "NAME",
+                "texts": repo_name
+            }
+        ],
+        "slaFilter": {
+            "field": "NAME",
+            "text": sla_name
+        }
+    }
+
+    result = client.post(_LOOKUP_QUERY, variables)
+    if not result:
+        return None
+
+    try:
+        repo_nodes = result["data"]["repo"]["nodes"]
+        sla_nodes = result["data"]["sla"]["nodes"]
+    except (TypeError, KeyError):
+        eprint(f"get_repo_and_sla_ids: unexpected response shape: {result}")
+        return None
+
+    repo_id = repo_nodes[0].get("id") if repo_nodes else None
+    sla_domain_id = sla_nodes[0].get("id") if sla_nodes else None
+    return repo_id, sla_domain_id
+
+# Run the two single-purpose lookups concurrently (fallback when batching fails)
+def get_repo_and_sla_ids_concurrently(client, github_repo, sla_name):
+    """
+    The lookups have no dependency on each other, so overlap their network I/O.
+    Returns (repo_id, sla_domain_id); either may be None.
+    """
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_repo = ex.submit(get_rubrik_repo_id, client, github_repo)
+        f_sla = ex.submit(get_rubrik_sla_domain_id, client, sla_name)
+        return f_repo.result(), f_sla.result()
+
 
 # -----------------------------
 # Backup + Monitor
 # -----------------------------
 
 # Trigger the on-demand snapshot and return the taskchainId for monitoring
-def trigger_on_demand_snapshot(rsc_uri, token, repo_id, sla_domain_id):
+def trigger_on_demand_snapshot(client, repo_id, sla_domain_id):
     """
     Triggers the on-demand snapshot and returns taskchainId.
     """
-    mutation = """
-    mutation GithubTakeOnDemandSnapshotMutation($input: BackupDevOpsRepositoryInput!) {
-      backupDevOpsRepository(input: $input) {
-        taskchainId
-        errorMessage
-        __typename
-      }
-    }
-    """.strip()
-
     variables = {
         "input": {
             "repositoryId": repo_id,
@@ -222,7 +590,7 @@ def trigger_on_demand_snapshot(rsc_uri, token, repo_id, sla_domain_id):
         }
     }
 
-    result = post_graphql(rsc_uri, token, mutation, variables)
+    result = client.post(_SNAPSHOT_MUTATION, variables)
     if not result:
         return None
 
@@ -238,107 +606,326 @@ def trigger_on_demand_snapshot(rsc_uri, token, repo_id, sla_domain_id):
 
     return taskchain_id
 
-# Polls EventSeriesDetailsQuery until lastActivityStatus is exactly 'Success' or 'Failure'.
-def wait_for_activity_series(rsc_uri, token, activity_series_id, poll_seconds=10):
+# Matches a string lastActivityStatus in the raw poll response (null never matches)
+_STATUS_RE = re.compile(rb'"lastActivityStatus"\s*:\s*"([^"]+)"')
+
+# Scans streamed response chunks for lastActivityStatus without a full JSON parse
+def scan_status(chunks):
     """
-    Polls EventSeriesDetailsQuery until lastActivityStatus is exactly 'Success' or 'Failure'.
-    IMPORTANT: Handles transient 'activitySeries' GraphQL 500 errors by sleeping and retrying.
+    Returns (status, None) once the status is found, or (None, raw_body) so the
+    caller can fall back to a full JSON parse (GraphQL errors, null status).
     """
-    url = f"{rsc_uri}/api/graphql"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
+    buf = b""
+    for chunk in chunks:
+        buf += chunk
+        match = _STATUS_RE.search(buf)
+        if match:
+            # Drain the (tiny) remainder so the keep-alive connection can be reused
+            for _ in chunks:
+                pass
+            return match.group(1).decode("utf-8"), None
+    return None, buf
+
+# POST the pre-serialized status poll and scan the streamed response (see scan_status).
+# Uses HTTP/2 (httpx) when available, else urllib3 directly, else the requests session.
+def post_status_poll(url, headers, body):
+    session = get_session()
+    if _HTTP2_CLIENT is not None:
+        with _HTTP2_CLIENT.stream("POST", url, headers=headers, content=body) as resp:
+            resp.raise_for_status()
+            return scan_status(resp.iter_bytes())
+
+    if _POLL_POOL is not None:
+        # Per-call headers replace the pool's defaults, so merge them in (Accept-Encoding)
+        resp = _POLL_POOL.request(
+            "POST", url, body=body, headers={**_POLL_POOL.headers, **headers},
+            timeout=30, preload_content=False
+        )
+        try:
+            if resp.status >= 400:
+                err = urllib3.exceptions.HTTPError(f"HTTP {resp.status} for url: {url}")
+                err.status = resp.status
+                raise err
+            return scan_status(resp.stream(8192))
+        finally:
+            # Read whatever is left (e.g. an error body) so the pooled connection is reusable
+            resp.drain_conn()
+            resp.release_conn()
+
+    with session.post(url, headers=headers, data=body, timeout=30, stream=True) as resp:
+        resp.raise_for_status()
+        return scan_status(resp.iter_content(8192))
 
-    query = """
-    query EventSeriesDetailsQuery($activitySeriesId: UUID!, $clusterUuid: UUID) {
-      activitySeries(
-        input: {activitySeriesId: $activitySeriesId, clusterUuid: $clusterUuid}
-      ) {
-        lastActivityStatus
-        activityConnection {
-          nodes {
-            activityInfo
-            errorInfo
-            message
-            status
-          }
-        }
-      }
+# Retries the status poll on transport errors with jittered exponential backoff,
+# so a brief network blip does not abort a multi-hour backup wait. The headers are
+# fetched per attempt, so a failed (or rejected) token refresh is retried as well.
+def post_with_retry(client, body, max_attempts=5, base=1.0):
+    for attempt in range(max_attempts):
+        try:
+            return post_status_poll(client.graphql_url, client.headers(), body)
+        except _HTTP_ERRORS as e:
+            client.check_unauthorized(e)
+            if attempt == max_attempts - 1:
+                raise
+            eprint(f"retrieve task status: request failed ({e}), retrying…")
+            time.sleep(base * 2 ** attempt + random.random())
+
+# Prints the activity messages (and any errors) recorded for a finished activity series
+def print_activity_details(client, activity_series_id):
+    """
+    Fetches the full activityConnection once, after a Failure has been observed.
+    Best effort: failures are reported to stderr but do not affect the result.
+    """
+    variables = {
+        "activitySeriesId": activity_series_id,
+        "clusterUuid": "00000000-0000-0000-0000-000000000000"
     }
-    """.strip()
 
+    result = client.post(_DETAILS_QUERY, variables)
+    if not result:
+        return
+
+    try:
+        nodes = result["data"]["activitySeries"]["activityConnection"]["nodes"]
+    except (TypeError, KeyError):
+        eprint(f"activity details: unexpected response shape: {result}")
+        return
+
+    for node in nodes or []:
+        print(f"  [{node.get('status')}] {node.get('message')}")
+        if node.get("errorInfo"):
+            eprint(f"    error: {node['errorInfo']}")
+
+# Polls EventSeriesStatusQuery until lastActivityStatus is exactly 'Success' or 'Failure'.
+def wait_for_activity_series(client, activity_series_id, poll_seconds=2.0, max_poll_seconds=30.0, probe_seconds=0.5, probe_attempts=15):
+    """
+    Polls EventSeriesStatusQuery until lastActivityStatus is exactly 'Success' or 'Failure'.
+    Until the series exists (transient 500 or null status) it is probed every
+    probe_seconds, up to probe_attempts times, and then every poll_seconds.
+    Once it has a status, the interval starts at poll_seconds and backs off
+    exponentially (with jitter) up to max_poll_seconds.
+    Only the status is fetched while polling; activity details are fetched once on Failure.
+    IMPORTANT: Handles transient 'activitySeries' GraphQL 500 errors by sleeping and retrying.
+    """
     variables = {
         "activitySeriesId": activity_series_id,
         "clusterUuid": "00000000-0000-0000-0000-000000000000"
     }
 
-    payload = {"query": query, "variables": variables}
+    # The poll request never changes, so serialize it once rather than per iteration
+    body = _dumps({"query": _POLL_QUERY, "variables": variables})
 
-    status = None
-    while status not in ("Success", "Failure"):
+    delay = poll_seconds
+    probes = 0
+    while True:
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=30)
-            resp.raise_for_status()
-        except requests.RequestException as e:
+            status, content = post_with_retry(client, body)
+        except _HTTP_ERRORS as e:
             eprint(f"retrieve task status: request failed: {e}")
             return None
 
-        try:
-            result = resp.json()
-        except ValueError:
-            eprint("retrieve task status: response was not valid JSON")
-            return None
-
-        if result.get("errors"):
-            # NEW: Treat specific activitySeries 500 as transient
-            if is_transient_activityseries_500(result["errors"]):
+        # No status in the raw body: parse it properly to find out why
+        trace_id = None
+        if status is None:
+            try:
+                result = _loads(content)
+            except ValueError:
+                eprint("retrieve task status: response was not valid JSON")
+                return None
+
+            if result.get("errors"):
+                # NEW: Treat specific activitySeries 500 as transient
+                if not is_transient_activityseries_500(result["errors"]):
+                    eprint(f"retrieve task status: GraphQL errors: {result['errors']}")
+                    return None
                 trace_id = extract_trace_id(result["errors"])
-                if trace_id:
-                    print(f"activitySeries not ready yet (transient 500). traceId={trace_id}. Waiting…")
-                else:
-                    print("activitySeries not ready yet (transient 500). Waiting…")
-                sleep_seconds(poll_seconds)
-                continue
-
-            eprint(f"retrieve task status: GraphQL errors: {result['errors']}")
-            return None
-
-        try:
-            status = result["data"]["activitySeries"]["lastActivityStatus"]
-        except (TypeError, KeyError):
-            eprint(f"retrieve task status: unexpected response shape: {result}")
-            return None
+            else:
+                try:
+                    status = result["data"]["activitySeries"]["lastActivityStatus"]
+                except (TypeError, KeyError):
+                    eprint(f"retrieve task status: unexpected response shape: {result}")
+                    return None
+
+        # The series has not materialized yet (transient 500 or null status).
+        # Probe it quickly at first, then settle into the regular backoff.
+        if status is None:
+            if probes == 0:
+                suffix = f" traceId={trace_id}." if trace_id else ""
+                print(f"activitySeries not ready yet.{suffix} Waiting…")
+            probes += 1
+            if probes <= probe_attempts:
+                time.sleep(probe_seconds)
+            else:
+                delay = poll_seconds
+                time.sleep(delay * random.uniform(0.9, 1.1))
+            continue
 
         print("Current Job Status:", status)
 
         if status in ("Success", "Failure"):
             break
 
-        sleep_seconds(poll_seconds)
+        delay = min(delay * 1.5, max_poll_seconds)
+        time.sleep(delay * random.uniform(0.9, 1.1))
 
     return status
 
+# Waits for a terminal status over a GraphQL subscription instead of polling
+def subscribe_activity_series(client, activity_series_id, idle_timeout=300):
+    """
+    Server-push alternative to wait_for_activity_series (graphql-transport-ws over
+    wss://<host>/api/graphql). Returns 'Success' or 'Failure', or None when the
+    subscription is unavailable, or nothing arrives for idle_timeout seconds,
+    so the caller can fall back to polling.
+    """
+    try:
+        from websockets.exceptions import WebSocketException
+        from websockets.sync.client import connect as ws_connect
+    except ImportError:
+        eprint("subscription: the websockets package is not installed")
+        return None
+
+    ws_url = f"ws{client.graphql_url[len('http'):]}"
+    variables = {
+        "activitySeriesId": activity_series_id,
+        "clusterUuid": "00000000-0000-0000-0000-000000000000"
+    }
+    subscribe = {
+        "id": "1",
+        "type": "subscribe",
+        "payload": {"query": _SUBSCRIPTION, "variables": variables}
+    }
+
+    try:
+        auth = client.auth_provider()
+        if not auth:
+            eprint("subscription: no access token")
+            return None
+        with ws_connect(ws_url, subprotocols=["graphql-transport-ws"],
+                        additional_headers={"Authorization": auth}, open_timeout=30) as ws:
+            ws.send(json.dumps({"type": "connection_init", "payload": {"Authorization": auth}}))
+            while True:
+                msg = _loads(ws.recv(timeout=idle_timeout))
+                kind = msg.get("type")
+
+                if kind == "connection_ack":
+                    ws.send(json.dumps(subscribe))
+                    # The series may have finished before the subscription was
+                    # registered (or the server only pushes changes), so read it once
+                    result = client.post(_POLL_QUERY, variables, report_errors=False)
+                    try:
+                        status = result["data"]["activitySeries"]["lastActivityStatus"]
+                    except (TypeError, KeyError):
+                        status = None
+                    if status in ("Success", "Failure"):
+                        print("Current Job Status:", status)
+                        return status
+                elif kind == "ping":
+                    ws.send(json.dumps({"type": "pong"}))
+                elif kind == "next":
+                    payload = msg.get("payload") or {}
+                    if payload.get("errors"):
+                        eprint(f"subscription: GraphQL errors: {payload['errors']}")
+                        return None
+                    series = (payload.get("data") or {}).get("activitySeriesEvents") or {}
+                    status = series.get("lastActivityStatus")
+                    if status:
+                        print("Current Job Status:", status)
+                    if status in ("Success", "Failure"):
+                        return status
+                elif kind in ("error", "complete"):
+                    eprint(f"subscription: ended without a terminal status: {msg}")
+                    return None
+    except TimeoutError:
+        eprint(f"subscription: no message for {idle_timeout}s")
+    except (OSError, ValueError, WebSocketException) as e:
+        eprint(f"subscription: failed: {e}")
+
+    return None
+
 # Wrapper logic around taking and waiting for snapshots
-def take_on_demand_snapshot(rsc_uri, token, repo_id, sla_domain_id, wait_for_completion):
+def take_on_demand_snapshot(client, repo_id, sla_domain_id, wait_for_completion, use_subscriptions=False):
     """
     Triggers the on-demand snapshot; optionally waits for Success/Failure.
-    Returns 'Triggered' if not waiting, else 'Success' or 'Failure'.
+    With use_subscriptions, waits on a GraphQL subscription and falls back to polling.
+    Returns 'Triggered' if not waiting, else 'Success' or 'Failure'
+    (activity details are printed on Failure).
     """
-    taskchain_id = trigger_on_demand_snapshot(rsc_uri, token, repo_id, sla_domain_id)
+    taskchain_id = trigger_on_demand_snapshot(client, repo_id, sla_domain_id)
     if not taskchain_id:
         return None
 
     print("Triggered taskchain ID:", taskchain_id)
 
-    # Give the series a moment to appear (your original behavior)
-    sleep_seconds(10)
-
+    # No warm-up sleep: until the series exists the first polls get a transient 500,
+    # which the poll loop already waits out.
     if not wait_for_completion:
         return "Triggered"
 
-    return wait_for_activity_series(rsc_uri, token, taskchain_id, poll_seconds=10)
+    status = None
+    if use_subscriptions:
+        status = subscribe_activity_series(client, taskchain_id)
+        if not status:
+            print("Subscription unavailable; falling back to polling.")
+
+    if not status:
+        status = wait_for_activity_series(client, taskchain_id)
+
+    # Only pay for the verbose activity listing when there is a failure to explain
+    if status == "Failure":
+        print_activity_details(client, taskchain_id)
+    return status
+
+
+# -----------------------------
+# Config
+# -----------------------------
+
+# strips an optional environment value, treating unset as empty
+def strip_env(value) -> str:
+    return (value or "").strip()
+
+# (environment variable, Config field, required, parser) -- read in a single pass
+_ENV_FIELDS = (
+    ("RUBRIK_RSC_URI", "rsc_uri", True, normalize_base_uri),
+    ("RUBRIK_CLIENT_ID", "client_id", True, strip_env),
+    ("RUBRIK_CLIENT_SECRET", "client_secret", True, strip_env),
+    ("GITHUB_REPO_NAME", "github_repo", True, strip_env),
+    ("RUBRIK_SLA_DOMAIN_NAME", "sla_domain_name", True, strip_env),
+    ("WAIT_FOR_COMPLETION", "wait", False, str_to_bool),
+    ("RUBRIK_USE_SUBSCRIPTIONS", "use_subscriptions", False, functools.partial(str_to_bool, default=False)),
+)
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Action inputs, read and validated once from the environment."""
+    rsc_uri: str
+    client_id: str
+    client_secret: str = field(repr=False)
+    github_repo: str
+    sla_domain_name: str
+    wait: bool = True
+    use_subscriptions: bool = False
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """
+        Builds the config from the environment (os.environ by default).
+        Returns None, after reporting every missing variable, if a required one is empty.
+        """
+        environ = os.environ if environ is None else environ
+        values = {}
+        missing = []
+        for name, attr, required, parse in _ENV_FIELDS:
+            value = parse(environ.get(name))
+            if required and not value:
+                missing.append(name)
+            values[attr] = value
+
+        if missing:
+            eprint("Missing required environment variables:", ", ".join(missing))
+            return None
+        return cls(**values)
 
 
 # -----------------------------
@@ -346,54 +933,47 @@ def take_on_demand_snapshot(rsc_uri, token, repo_id, sla_domain_id, wait_for_com
 # -----------------------------
 
 def main():
-    rsc_uri = normalize_base_uri(os.getenv("RUBRIK_RSC_URI"))
-    client_id = (os.getenv("RUBRIK_CLIENT_ID") or "").strip()
-    client_secret = (os.getenv("RUBRIK_CLIENT_SECRET") or "").strip()
-    github_repo = (os.getenv("GITHUB_REPO_NAME") or "").strip()
-    sla_domain_name = (os.getenv("RUBRIK_SLA_DOMAIN_NAME") or "").strip()
-    wait_for_completion = str_to_bool(os.getenv("WAIT_FOR_COMPLETION", "true"), default=True)
-
-    missing = []
-    if not rsc_uri:
-        missing.append("RUBRIK_RSC_URI")
-    if not client_id:
-        missing.append("RUBRIK_CLIENT_ID")
-    if not client_secret:
-        missing.append("RUBRIK_CLIENT_SECRET")
-    if not github_repo:
-        missing.append("GITHUB_REPO_NAME")
-    if not sla_domain_name:
-        missing.append("RUBRIK_SLA_DOMAIN_NAME")
-
-    if missing:
-        eprint("Missing required environment variables:", ", ".join(missing))
+    cfg = Config.from_env()
+    if cfg is None:
         return 1
 
     try:
-        token = get_access_token(rsc_uri, client_id, client_secret)
-        if not token:
+        # Everything downstream asks this for the Authorization value, so a long
+        # wait transparently picks up a refreshed token instead of failing with 401.
+        auth_provider = functools.partial(get_auth_header, cfg.rsc_uri, cfg.client_id, cfg.client_secret)
+        if not auth_provider():
             eprint("Failed to obtain access token.")
             return 1
+        forget_token = functools.partial(forget_access_token, cfg.rsc_uri, cfg.client_id, cfg.client_secret)
+        client = RscClient(cfg.rsc_uri, auth_provider, forget_token)
+
+        ids = get_repo_and_sla_ids(client, cfg.github_repo, cfg.sla_domain_name)
+        if not ids:
+            print("Batched lookup failed; retrying repo and SLA lookups separately.")
+            ids = get_repo_and_sla_ids_concurrently(
+                client, cfg.github_repo, cfg.sla_domain_name
+            )
+        repo_id, sla_domain_id = ids
 
-        repo_id = get_rubrik_repo_id(rsc_uri, token, github_repo)
         print("Working with repo id:", repo_id)
         if not repo_id:
             eprint("Repo not found in Rubrik (repo_id is empty).")
             return 1
 
-        sla_domain_id = get_rubrik_sla_domain_id(rsc_uri, token, sla_domain_name)
         print("Working with SLA domain id:", sla_domain_id)
         if not sla_domain_id:
             eprint("SLA Domain not found in Rubrik (sla_domain_id is empty).")
             return 1
 
-        final_status = take_on_demand_snapshot(rsc_uri, token, repo_id, sla_domain_id, wait_for_completion)
+        final_status = take_on_demand_snapshot(
+            client, repo_id, sla_domain_id, cfg.wait, cfg.use_subscriptions
+        )
 
         if not final_status:
             eprint("Backup failed due to earlier error.")
             return 1
 
-        if not wait_for_completion:
+        if not cfg.wait:
             print("✅ Backup triggered successfully (not waiting). Status:", final_status)
             return 0
 